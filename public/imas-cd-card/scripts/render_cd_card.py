@@ -11,21 +11,31 @@ Design targets (current iteration):
 - URL must be a single line (no wrapping); shrink font to fit.
 
 Run (recommended via uv):
-  uv run --isolated --with pillow --with requests --with beautifulsoup4 --with qrcode \
+  uv run --isolated --with pillow --with numpy --with requests --with beautifulsoup4 --with lxml --with segno \
     python scripts/render_cd_card.py --url <event_url> --out out.png
 """
 
 from __future__ import annotations
 
 import argparse
+import functools
+import hashlib
+import json
+import os
 import re
+import tempfile
+from dataclasses import dataclass, field
 from io import BytesIO
+from pathlib import Path
 from urllib.parse import urljoin
 
+import numpy as np
 import requests
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, FeatureNotFound
 from PIL import Image, ImageDraw, ImageFont
-import qrcode
+import segno
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 
 # Track number formats vary by site:
@@ -33,83 +43,203 @@ import qrcode
 # - ShinyColors Lantis pages: "1．Title" (Japanese dot)
 TRACK_RE = re.compile(r"^(?P<no>\d{1,2})\s*[：:.．]\s*(?P<title>.+)$")
 STOP_RE = re.compile(r"^(text|-->|■)")
+# SideM Lantis pages: "YYYY.M.D RELEASE"
+RELEASE_RE = re.compile(r"^(\d{4})[./-](\d{1,2})[./-](\d{1,2})\s+RELEASE\b")
+STAFF_MARKERS = ("作詞", "作曲", "編曲")
 
+# Some hosts (e.g. shinycolors.lantis.jp) return 403 without a browser-like User-Agent.
+UA = (
+    "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+)
 
-def _wrap(draw: ImageDraw.ImageDraw, text: str, font: ImageFont.FreeTypeFont, maxw: int):
+# One keep-alive pool for release pages + cover images; the batch script renders many
+# cards against the same few hosts, so reusing connections avoids a TLS handshake per fetch.
+_SESSION = requests.Session()
+_SESSION.headers.update({"User-Agent": UA})
+_SESSION.mount(
+    "https://",
+    HTTPAdapter(
+        pool_connections=8,
+        pool_maxsize=32,
+        max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=[502, 503, 504]),
+    ),
+)
+
+# Release pages + covers rarely change between runs; keep them on disk and revalidate
+# with If-None-Match / If-Modified-Since so reruns mostly get 304s.
+CACHE_DIR = Path("~/.cache/imas-cd-card").expanduser()
+
+
+# Per-glyph advance widths keyed by (font path, size, char). Track lists repeat the same
+# kana/kanji a lot, so most lookups skip FreeType entirely.
+_ADVANCES: dict[tuple, float] = {}
+
+
+@functools.lru_cache(maxsize=128)
+def _load_font(path: str, size: int) -> ImageFont.FreeTypeFont:
+    # Parsing the CJK .otf is expensive; fonts are only measured/drawn with, never mutated.
+    return ImageFont.truetype(path, size)
+
+
+def _advance(font: ImageFont.FreeTypeFont, ch: str) -> float:
+    key = (font.path, font.size, ch)
+    adv = _ADVANCES.get(key)
+    if adv is None:
+        adv = _ADVANCES[key] = font.getlength(ch)
+    return adv
+
+
+def _text_width(font: ImageFont.FreeTypeFont, text: str) -> float:
+    return sum(_advance(font, ch) for ch in text)
+
+
+def _wrap(text: str, font: ImageFont.FreeTypeFont, maxw: int):
+    # Single pass over cumulative glyph advances instead of re-measuring line+ch each step.
     out = []
     line = ""
+    acc = 0.0
     for ch in text:
-        test = line + ch
-        if draw.textlength(test, font=font) <= maxw:
-            line = test
+        adv = _advance(font, ch)
+        if acc + adv <= maxw:
+            line += ch
+            acc += adv
         else:
             if line:
                 out.append(line)
             line = ch
+            acc = adv
     if line:
         out.append(line)
     return out
 
 
-def fetch_release_page(url: str, timeout: int = 30) -> BeautifulSoup:
-    # Some hosts (e.g. shinycolors.lantis.jp) return 403 without a browser-like User-Agent.
-    headers = {
-        "User-Agent": (
-            "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 "
-            "(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
-        )
-    }
-    html = requests.get(url, timeout=timeout, headers=headers).text
-    return BeautifulSoup(html, "html.parser")
+def _write_atomic(path: Path, data: bytes) -> None:
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=path.name, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def _cached_get(url: str, timeout: int = 30, session: requests.Session | None = None) -> bytes:
+    """GET url through the shared session, backed by a conditional on-disk cache.
+
+    Set IMAS_CD_NOCACHE=1 to bypass the cache entirely.
+    """
+    session = session or _SESSION
+    if os.environ.get("IMAS_CD_NOCACHE") == "1":
+        r = session.get(url, timeout=timeout)
+        r.raise_for_status()
+        return r.content
+
+    key = hashlib.sha256(url.encode()).hexdigest()[:16]
+    body_path = CACHE_DIR / f"{key}.body"
+    meta_path = CACHE_DIR / f"{key}.json"
+
+    meta = {}
+    headers = {}
+    if body_path.exists() and meta_path.exists():
+        try:
+            meta = json.loads(meta_path.read_text("utf-8"))
+        except ValueError:
+            meta = {}
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+
+    r = session.get(url, timeout=timeout, headers=headers)
+    if r.status_code == 304 and headers:
+        return body_path.read_bytes()
+    r.raise_for_status()
+
+    etag = r.headers.get("ETag")
+    last_modified = r.headers.get("Last-Modified")
+    if etag or last_modified:
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        _write_atomic(body_path, r.content)
+        meta = {"url": url, "etag": etag, "last_modified": last_modified}
+        _write_atomic(meta_path, json.dumps(meta).encode("utf-8"))
+    return r.content
+
+
+def fetch_release_page(url: str, timeout: int = 30, session: requests.Session | None = None) -> BeautifulSoup:
+    html = _cached_get(url, timeout=timeout, session=session)
+    # lxml (libxml2) builds the tree much faster than the pure-Python html.parser.
+    try:
+        return BeautifulSoup(html, "lxml")
+    except FeatureNotFound:
+        return BeautifulSoup(html, "html.parser")
 
 
 def parse_release_info(url: str, soup: BeautifulSoup):
-    text = soup.get_text("\n")
+    # Only extract text from the content container; header/nav/footer never match.
+    root = soup.select_one("div.release_info") or soup.select_one("main") or soup
+    text = root.get_text("\n")
     lines = [ln.strip() for ln in text.split("\n") if ln.strip()]
 
-    def first_line(regex: str) -> str:
-        for ln in lines:
-            if re.search(regex, ln):
-                return ln
-        return ""
+    # Single pass over lines: pick the first candidate for each field and collect
+    # tracks as we go. Cheap str checks run before any regex.
+    release_ln = ""
+    release_m = None
+    cv_ln = ""
+    artist_ln = ""
+    idolm_ln = ""
+    tracks = []
+    cur = None
+    for ln in lines:
+        if not release_ln and ln.startswith("発売日"):
+            release_ln = ln
+        if not cv_ln and "CV." in ln:
+            cv_ln = ln
+        if not artist_ln and ln.startswith("アーティスト"):
+            artist_ln = ln
+        if not idolm_ln and "THE IDOLM@STER" in ln and "RELEASE" not in ln:
+            idolm_ln = ln
+
+        # tracklist + staff (heuristic: staff lines follow track and contain 作詞/作曲/編曲)
+        if ln[:1].isdigit():
+            if release_m is None:
+                release_m = RELEASE_RE.match(ln)
+            m = TRACK_RE.match(ln)
+            if m:
+                if cur:
+                    tracks.append(cur)
+                no = m.group("no")
+                title_part = m.group("title").strip()
+                cur = {"no": f"{int(no):02d}", "title": title_part, "staff": []}
+                continue
+        if not cur:
+            continue
+        if any(mk in ln for mk in STAFF_MARKERS) and not STOP_RE.match(ln):
+            cur["staff"].append(ln)
+    if cur:
+        tracks.append(cur)
 
     # title
     h2 = soup.find("h2")
     title = h2.get_text(" ", strip=True) if h2 else ""
     if not title:
-        for ln in lines:
-            if "THE IDOLM@STER" in ln and "RELEASE" not in ln:
-                title = ln
-                break
+        title = idolm_ln
 
     # release date
     # - Some pages use Japanese label: "発売日：YYYY/M/D"
     # - SideM Lantis pages often use: "YYYY.M.D RELEASE"
     release_date = ""
-    release_ln = first_line(r"^発売日")
     if release_ln and "：" in release_ln:
         release_date = release_ln.split("：", 1)[1].strip()
-    if not release_date:
-        for ln in lines:
-            m = re.match(r"^(\d{4})[./-](\d{1,2})[./-](\d{1,2})\s+RELEASE\b", ln)
-            if m:
-                y, mo, d = m.group(1), int(m.group(2)), int(m.group(3))
-                release_date = f"{y}/{mo}/{d}"
-                break
+    if not release_date and release_m:
+        y, mo, d = release_m.group(1), int(release_m.group(2)), int(release_m.group(3))
+        release_date = f"{y}/{mo}/{d}"
 
     # artist line (keep)
     # - Many IM@S Lantis pages include a "CV." line
     # - ShinyColors release pages use "アーティスト：..."
-    artists = ""
-    for ln in lines:
-        if "CV." in ln:
-            artists = ln
-            break
-    if not artists:
-        for ln in lines:
-            if ln.startswith("アーティスト"):
-                artists = ln
-                break
+    artists = cv_ln or artist_ln
 
     # cover (lantis pages usually have div.release_img img)
     cover_src = None
@@ -118,27 +248,6 @@ def parse_release_info(url: str, soup: BeautifulSoup):
         cover_src = main_img["src"]
     cover_url = urljoin(url, cover_src) if cover_src else None
 
-    # tracklist + staff (heuristic: staff lines follow track and contain 作詞/作曲/編曲)
-    tracks = []
-    cur = None
-    for ln in lines:
-        m = TRACK_RE.match(ln)
-        if m:
-            if cur:
-                tracks.append(cur)
-            no = m.group("no")
-            title_part = m.group("title").strip()
-            cur = {"no": f"{int(no):02d}", "title": title_part, "staff": []}
-            continue
-        if not cur:
-            continue
-        if STOP_RE.match(ln):
-            continue
-        if "作詞" in ln or "作曲" in ln or "編曲" in ln:
-            cur["staff"].append(ln)
-    if cur:
-        tracks.append(cur)
-
     return {
         "title": title,
         "release_date": release_date,
@@ -148,253 +257,289 @@ def parse_release_info(url: str, soup: BeautifulSoup):
     }
 
 
-def fetch_image(url: str, timeout: int = 30) -> Image.Image:
-    headers = {
-        "User-Agent": (
-            "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 "
-            "(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
-        )
-    }
-    r = requests.get(url, timeout=timeout, headers=headers)
-    r.raise_for_status()
-    return Image.open(BytesIO(r.content)).convert("RGB")
+def fetch_image(
+    url: str,
+    timeout: int = 30,
+    max_side: int | None = None,
+    session: requests.Session | None = None,
+) -> Image.Image:
+    data = _cached_get(url, timeout=timeout, session=session)
+    im = Image.open(BytesIO(data))
+    if max_side:
+        # JPEG covers can be decoded at a reduced scale (still >= max_side) by libjpeg.
+        im.draft("RGB", (max_side, max_side))
+    im.load()
+    return im if im.mode == "RGB" else im.convert("RGB")
 
 
 def make_qr(url: str, size: int = 190) -> Image.Image:
-    qr = qrcode.QRCode(border=1, box_size=6)
-    qr.add_data(url)
-    qr.make(fit=True)
-    return qr.make_image(fill_color="black", back_color="white").convert("RGB").resize((size, size))
+    # segno hands us the module matrix directly (1 = dark); scale it with numpy by the
+    # largest whole factor that fits and centre it on a white size x size square.
+    q = segno.make_qr(url, error="m")
+    matrix = np.pad(np.array(q.matrix, dtype=np.uint8), 1)  # 1-module quiet zone
+    s = max(1, size // matrix.shape[0])
+    big = np.kron(matrix, np.ones((s, s), np.uint8))
+    out = np.full((size, size), 255, np.uint8)
+    off = (size - big.shape[0]) // 2
+    out[off : off + big.shape[0], off : off + big.shape[1]] = np.where(big, 0, 255)
+    return Image.fromarray(out, "L")
 
 
 def fit_one_line_font(
-    draw: ImageDraw.ImageDraw,
     text: str,
     font_path: str,
     maxw: int,
     start_size: int = 20,
     min_size: int = 12,
 ):
-    size = start_size
-    while size >= min_size:
-        f = ImageFont.truetype(font_path, size)
-        if draw.textlength(text, font=f) <= maxw:
-            return f
-        size -= 1
-    return ImageFont.truetype(font_path, min_size)
+    # Text width grows monotonically with size: bisect for the largest size that fits.
+    lo, hi = min_size, start_size
+    best = min_size
+    while lo <= hi:
+        mid = (lo + hi) // 2
+        if _text_width(_load_font(font_path, mid), text) <= maxw:
+            best = mid
+            lo = mid + 1
+        else:
+            hi = mid - 1
+    return _load_font(font_path, best)
+
+
+@functools.lru_cache(maxsize=16)
+def _corner_tiles(radius: int, fill: tuple, outline: tuple, width: int) -> tuple[Image.Image, ...]:
+    """Rounded-rectangle corners (tl, tr, bl, br) as RGBA tiles, drawn once per style."""
+    c = radius + 1
+    side = 2 * c + 1
+    tmpl = Image.new("RGBA", (side, side), (0, 0, 0, 0))
+    ImageDraw.Draw(tmpl).rounded_rectangle(
+        [0, 0, side - 1, side - 1], radius=radius, fill=fill, outline=outline, width=width
+    )
+    return (
+        tmpl.crop((0, 0, c, c)),
+        tmpl.crop((side - c, 0, side, c)),
+        tmpl.crop((0, side - c, c, side)),
+        tmpl.crop((side - c, side - c, side, side)),
+    )
 
 
-def _estimate_height(
+def _rounded_panel(
+    img: Image.Image,
     draw: ImageDraw.ImageDraw,
-    info: dict,
-    font_title: ImageFont.FreeTypeFont,
-    font_date: ImageFont.FreeTypeFont,
-    font_body: ImageFont.FreeTypeFont,
-    font_small: ImageFont.FreeTypeFont,
-    font_staff: ImageFont.FreeTypeFont,
-    w: int,
-    pad: int,
-    left_w: int,
-    max_height: int,
-    qr_size: int,
-) -> int:
-    """Estimate needed canvas height for current content.
-
-    We keep the left panel cover size fixed (square: left_w-40).
-    Right panel height grows with track count + staff.
+    box: list[int],
+    radius: int,
+    fill: tuple,
+    outline: tuple,
+    width: int,
+) -> None:
+    """Same pixels as draw.rounded_rectangle, but corners are pasted from cached tiles
+    and only the straight fill/edges are drawn."""
+    x0, y0, x1, y1 = box
+    c = radius + 1
+    tl, tr, bl, br = _corner_tiles(radius, fill, outline, width)
+    draw.rectangle([x0 + c, y0, x1 - c, y1], fill=fill)
+    draw.rectangle([x0, y0 + c, x1, y1 - c], fill=fill)
+    draw.rectangle([x0 + c, y0, x1 - c, y0 + width - 1], fill=outline)
+    draw.rectangle([x0 + c, y1 - width + 1, x1 - c, y1], fill=outline)
+    draw.rectangle([x0, y0 + c, x0 + width - 1, y1 - c], fill=outline)
+    draw.rectangle([x1 - width + 1, y0 + c, x1, y1 - c], fill=outline)
+    img.paste(tl, (x0, y0), tl)
+    img.paste(tr, (x1 - c + 1, y0), tr)
+    img.paste(bl, (x0, y1 - c + 1), bl)
+    img.paste(br, (x1 - c + 1, y1 - c + 1), br)
+
+
+@dataclass
+class CardContext:
+    """Everything render_card needs that doesn't change from card to card.
+
+    Build it once (make_card_context) and reuse it across a batch.
     """
 
-    right_x = pad + left_w + 30
-    right_w = w - right_x - pad
-
-    # Top blocks
-    y = pad + 18
-
-    artists = info.get("artists", "") or ""
-    if artists:
-        y += len(_wrap(draw, artists, font_small, right_w - 40)[:2]) * (font_small.size + 3)
-        y += 8
-
-    # header
-    y += font_body.size + 8
-
-    # tracks
-    for t in info.get("tracks", []) or []:
-        # main line: we render 1 line
-        y += font_body.size + 2
-        # staff: up to 2 wrapped lines
-        if t.get("staff"):
-            staff = " / ".join(t["staff"])
-            y += len(_wrap(draw, staff, font_staff, right_w - 60)[:2]) * (font_staff.size + 2)
-        y += 8
-
-    # QR + URL
-    y += 18 + qr_size + 8
-    y += font_small.size + 10
+    font_path: str
+    fonts: dict[str, ImageFont.FreeTypeFont]
+    pad: int = 30
+    left_w: int = 430
+    qr_size: int = 190
+    session: requests.Session = field(default_factory=lambda: _SESSION)
+
+
+def make_card_context(font_path: str, session: requests.Session | None = None) -> CardContext:
+    fonts = {
+        "date": _load_font(font_path, 30),
+        "title": _load_font(font_path, 34),
+        "body": _load_font(font_path, 26),
+        "small": _load_font(font_path, 20),
+        "staff": _load_font(font_path, 22),
+    }
+    return CardContext(font_path=font_path, fonts=fonts, session=session or _SESSION)
 
-    # Bottom padding
-    y += pad
 
-    # Minimum height: must fit left panel content (date+title+cover)
-    left_min = pad + 18
-    if info.get("release_date"):
-        left_min += len(_wrap(draw, f"発売日：{info['release_date']}", font_date, left_w - 40)) * (font_date.size + 6)
-    left_min += len(_wrap(draw, info.get("title", ""), font_title, left_w - 40)) * (font_title.size + 4)
-    left_min += 10 + (left_w - 40) + pad  # cover + spacing + bottom
+@dataclass
+class LaidOut:
+    """Card height plus the draw ops render_card replays onto the real canvas."""
 
-    # "wrap content": do not force a fixed minimum beyond what's needed.
-    need = max(y, left_min)
-    return min(max_height, need)
+    height: int
+    ops: list[tuple]
 
 
-def render_card(
+def _layout(
     event_url: str,
     info: dict,
-    font_path: str,
-    out_path: str,
-    w: int = 1200,
+    ctx: CardContext,
+    w: int,
+    max_height: int,
     h: int | None = None,
-    max_height: int = 1500,
-):
-    # We'll decide height dynamically if not provided.
-    # Fonts are needed for measurement.
-    pad = 30
-    left_w = 430
-    qr_size = 190
-
-    font_date = ImageFont.truetype(font_path, 30)
-    font_title = ImageFont.truetype(font_path, 34)
-    font_body = ImageFont.truetype(font_path, 26)
-    font_small = ImageFont.truetype(font_path, 20)
-    font_staff = ImageFont.truetype(font_path, 22)
-
-    # Temporary draw for measurement
-    tmp = Image.new("RGB", (w, 10), (0, 0, 0))
-    tmp_draw = ImageDraw.Draw(tmp)
+) -> LaidOut:
+    """Measure and position everything on the card in a single pass.
 
-    if h is None:
-        h = _estimate_height(
-            tmp_draw,
-            info,
-            font_title,
-            font_date,
-            font_body,
-            font_small,
-            font_staff,
-            w=w,
-            pad=pad,
-            left_w=left_w,
-            max_height=max_height,
-            qr_size=qr_size,
-        )
-    else:
-        h = min(max_height, h)
-
-    img = Image.new("RGB", (w, h), (250, 250, 250))
-    draw = ImageDraw.Draw(img)
+    We keep the left panel cover size fixed (square: left_w-40).
+    Right panel height grows with track count + staff.
+    If h is None the height is wrap-content, capped at max_height.
 
-    # fonts already prepared above
+    Ops are ("text", x, y, text, font, fill), ("rect", box, outline, width) and
+    ("rounded_rect", box, radius, fill, outline, width). Cover and QR images need the
+    real canvas, so they are left as ("cover", box) / ("qr", x, y) slots.
+    """
+    pad, left_w, qr_size = ctx.pad, ctx.left_w, ctx.qr_size
+    font_date = ctx.fonts["date"]
+    font_title = ctx.fonts["title"]
+    font_body = ctx.fonts["body"]
+    font_small = ctx.fonts["small"]
+    font_staff = ctx.fonts["staff"]
 
     right_x = pad + left_w + 30
     right_w = w - right_x - pad
 
-    panel = (255, 255, 255)
-    draw.rounded_rectangle(
-        [pad, pad, pad + left_w, h - pad],
-        radius=18,
-        fill=panel,
-        outline=(225, 225, 225),
-        width=2,
-    )
-    draw.rounded_rectangle(
-        [right_x, pad, w - pad, h - pad],
-        radius=18,
-        fill=panel,
-        outline=(225, 225, 225),
-        width=2,
-    )
+    ops: list[tuple] = []
 
     # left: date + title + cover
     x = pad + 20
     y = pad + 18
 
     if info.get("release_date"):
-        for ln in _wrap(draw, f"発売日：{info['release_date']}", font_date, left_w - 40):
-            draw.text((x, y), ln, font=font_date, fill=(60, 60, 60))
+        for ln in _wrap(f"発売日：{info['release_date']}", font_date, left_w - 40):
+            ops.append(("text", x, y, ln, font_date, (60, 60, 60)))
             y += font_date.size + 6
 
-    for ln in _wrap(draw, info.get("title", ""), font_title, left_w - 40):
-        draw.text((x, y), ln, font=font_title, fill=(20, 20, 20))
+    for ln in _wrap(info.get("title", ""), font_title, left_w - 40):
+        ops.append(("text", x, y, ln, font_title, (20, 20, 20)))
         y += font_title.size + 4
 
     y += 10
     cover_box = [pad + 20, y, pad + left_w - 20, y + (left_w - 40)]
     if info.get("cover_url"):
-        cover = fetch_image(info["cover_url"])
-        ci = cover.copy()
-        ci.thumbnail((left_w - 40, left_w - 40))
-        cx = cover_box[0] + ((left_w - 40) - ci.size[0]) // 2
-        cy = cover_box[1] + ((left_w - 40) - ci.size[1]) // 2
-        img.paste(ci, (cx, cy))
-    draw.rectangle(cover_box, outline=(210, 210, 210), width=2)
+        ops.append(("cover", cover_box))
+    ops.append(("rect", cover_box, (210, 210, 210), 2))
+
+    # Minimum height: must fit left panel content (date+title+cover)
+    left_min = y + (left_w - 40) + pad
 
     # right: artists + tracklist + QR + one-line URL
     rx = right_x + 20
     ry = pad + 18
 
-    artists = info.get("artists", "")
+    artists = info.get("artists", "") or ""
     if artists:
-        for ln in _wrap(draw, artists, font_small, right_w - 40)[:2]:
-            draw.text((rx, ry), ln, font=font_small, fill=(50, 50, 50))
+        for ln in _wrap(artists, font_small, right_w - 40)[:2]:
+            ops.append(("text", rx, ry, ln, font_small, (50, 50, 50)))
             ry += font_small.size + 3
         ry += 8
 
-    draw.text((rx, ry), "曲目 / Staff", font=font_body, fill=(10, 10, 10))
+    ops.append(("text", rx, ry, "曲目 / Staff", font_body, (10, 10, 10)))
     ry += font_body.size + 8
 
-    for t in info.get("tracks", []):
+    for t in info.get("tracks", []) or []:
+        # main line: we render 1 line
         main = f"{t['no']} {t['title']}"
-        draw.text(
-            (rx, ry),
-            _wrap(draw, main, font_body, right_w - 40)[0],
-            font=font_body,
-            fill=(30, 30, 30),
-        )
+        ops.append(("text", rx, ry, _wrap(main, font_body, right_w - 40)[0], font_body, (30, 30, 30)))
         ry += font_body.size + 2
 
+        # staff: up to 2 wrapped lines
         if t.get("staff"):
             staff = " / ".join(t["staff"])
-            for ln in _wrap(draw, staff, font_staff, right_w - 60)[:2]:
-                draw.text((rx + 20, ry), ln, font=font_staff, fill=(95, 95, 95))
+            for ln in _wrap(staff, font_staff, right_w - 60)[:2]:
+                ops.append(("text", rx + 20, ry, ln, font_staff, (95, 95, 95)))
                 ry += font_staff.size + 2
         ry += 8
 
-    qr_img = make_qr(event_url, size=qr_size)
+    if h is None:
+        # QR + URL + bottom padding below the tracklist.
+        need_right = ry + 18 + qr_size + 8 + font_small.size + 10 + pad
+        # "wrap content": do not force a fixed minimum beyond what's needed.
+        h = min(max_height, max(need_right, left_min))
+    else:
+        h = min(max_height, h)
+
     qr_x = rx
     qr_y = ry + 18
 
     # If we hit max_height, track list may overflow into the QR area.
-    # In that case, truncate and add a "…" marker.
-    qr_top_limit = qr_y
-    if qr_top_limit < (pad + 18):
-        qr_top_limit = pad + 18
-
     if qr_y + qr_size + 8 + font_small.size + pad > h - pad:
         # move QR to bottom area if even the base computation was too small
         qr_y = h - pad - qr_size - 8 - font_small.size
 
     # If tracklist already went beyond where QR should start, mark truncation.
     if ry > qr_y:
-        draw.text((rx, qr_y - (font_small.size + 6)), "……（曲目过多，已截断）", font=font_small, fill=(110, 110, 110))
+        ops.append(("text", rx, qr_y - (font_small.size + 6), "……（曲目过多，已截断）", font_small, (110, 110, 110)))
 
-    img.paste(qr_img, (qr_x, qr_y))
-    draw.rectangle([qr_x, qr_y, qr_x + qr_size, qr_y + qr_size], outline=(210, 210, 210), width=2)
+    ops.append(("qr", qr_x, qr_y))
+    ops.append(("rect", [qr_x, qr_y, qr_x + qr_size, qr_y + qr_size], (210, 210, 210), 2))
 
     url_y = qr_y + qr_size + 8
-    url_font = fit_one_line_font(draw, event_url, font_path, maxw=right_w - 40, start_size=20, min_size=12)
-    draw.text((rx, url_y), event_url, font=url_font, fill=(80, 80, 80))
+    url_font = fit_one_line_font(event_url, ctx.font_path, maxw=right_w - 40, start_size=20, min_size=12)
+    ops.append(("text", rx, url_y, event_url, url_font, (80, 80, 80)))
+
+    # Panels go underneath everything else; they need the final height.
+    panel = (255, 255, 255)
+    panels = [
+        ("rounded_rect", [pad, pad, pad + left_w, h - pad], 18, panel, (225, 225, 225), 2),
+        ("rounded_rect", [right_x, pad, w - pad, h - pad], 18, panel, (225, 225, 225), 2),
+    ]
+    return LaidOut(height=h, ops=panels + ops)
+
+
+def render_card(
+    event_url: str,
+    info: dict,
+    ctx: CardContext,
+    out_path: str,
+    w: int = 1200,
+    h: int | None = None,
+    max_height: int = 1500,
+    save_kwargs: dict | None = None,
+):
+    # We'll decide height dynamically if not provided.
+    # Measurement goes through font.getlength, so no scratch canvas is needed.
+    laid = _layout(event_url, info, ctx, w=w, max_height=max_height, h=h)
+
+    img = Image.new("RGB", (w, laid.height), (250, 250, 250))
+    draw = ImageDraw.Draw(img)
 
-    img.save(out_path, "PNG")
+    for op in laid.ops:
+        kind = op[0]
+        if kind == "text":
+            _, x, y, text, font, fill = op
+            draw.text((x, y), text, font=font, fill=fill)
+        elif kind == "rect":
+            _, box, outline, width = op
+            draw.rectangle(box, outline=outline, width=width)
+        elif kind == "rounded_rect":
+            _, box, radius, fill, outline, width = op
+            _rounded_panel(img, draw, box, radius, fill, outline, width)
+        elif kind == "cover":
+            box = op[1]
+            side = box[2] - box[0]
+            ci = fetch_image(info["cover_url"], max_side=side, session=ctx.session)
+            ci.thumbnail((side, side))
+            cx = box[0] + (side - ci.size[0]) // 2
+            cy = box[1] + (side - ci.size[1]) // 2
+            img.paste(ci, (cx, cy))
+        elif kind == "qr":
+            _, x, y = op
+            img.paste(make_qr(event_url, size=ctx.qr_size), (x, y))
+
+    # save_kwargs lets callers trade size for speed (e.g. compress_level=1 for intermediates).
+    img.save(out_path, "PNG", **(save_kwargs or {}))
 
 
 def main() -> int:
@@ -422,7 +567,7 @@ def main() -> int:
     render_card(
         args.url,
         info,
-        args.font,
+        make_card_context(args.font),
         args.out,
         w=args.width,
         h=fixed_h,
@@ -9,11 +9,12 @@ Workflow:
 5) Create a ZIP containing the merged PNG (workaround for Telegram image downscaling).
 
 Recommended run (uv isolated):
-  uv run --isolated --with imas-tools==0.4.8 --with pytz --with pillow --with requests --with beautifulsoup4 --with qrcode \
+  uv run --isolated --with imas-tools==0.4.8 --with pillow --with numpy --with requests --with beautifulsoup4 --with lxml --with segno \
     python scripts/render_cd_cards_from_schedule.py --past-days 14 --tz Asia/Tokyo --out-prefix cd_cards_past2w
+  (Optional: replace `--with pillow` by `--with pillow-simd` for faster PIL kernels; needs a C build toolchain.)
 
 Outputs:
-  <out-prefix>_merged.png
+  <out-prefix>_merged.png (or <out-prefix>_merged_01.png, ... with --chunk-cards)
   <out-prefix>_merged.zip
   <out-dir>/cards/*.png
 """
@@ -21,27 +22,23 @@ Outputs:
 from __future__ import annotations
 
 import argparse
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 import os
 import re
+import sys
 import zipfile
 from urllib.parse import urlparse
+from zoneinfo import ZoneInfo
 
-import pytz
-from PIL import Image, ImageDraw
+import numpy as np
+from PIL import Image
 
 from imas_tools.portal.article import _fetch_schedule
 
-# Local import of renderer script (same folder)
-import importlib.util
-
-
-def load_renderer(path: str):
-    spec = importlib.util.spec_from_file_location("render_cd_card", path)
-    mod = importlib.util.module_from_spec(spec)
-    assert spec and spec.loader
-    spec.loader.exec_module(mod)  # type: ignore
-    return mod
+# Renderer lives in the same folder; import it as a regular (cached) module.
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import render_cd_card as renderer  # noqa: E402
 
 
 def is_bad_event_url(url: str) -> bool:
@@ -53,6 +50,41 @@ def safe_name(url: str, max_len: int = 80) -> str:
     return re.sub(r"[^A-Za-z0-9._-]+", "_", url)[:max_len]
 
 
+def merge_cards(card_paths: list[str], out_png: str, pad: int = 30) -> tuple[int, int]:
+    """Merge card PNGs into one single-column PNG; returns the canvas size."""
+    # Sizes come from the PNG headers only; cards are decoded one at a time below.
+    sizes = []
+    for p in card_paths:
+        with Image.open(p) as im:
+            sizes.append(im.size)
+    w = max(iw for iw, _ in sizes)
+    bg = (245, 245, 245)
+    W = pad + w + pad
+    H = pad + sum(ih for _, ih in sizes) + pad * (len(sizes) - 1) + pad
+
+    # Compose in a numpy buffer: plain slice copies instead of per-card paste + draw.
+    arr = np.full((H, W, 3), bg, np.uint8)
+    outline = (220, 220, 220)
+
+    y = pad
+    for p, (iw, ih) in zip(card_paths, sizes):
+        x = pad + (w - iw) // 2
+        with Image.open(p) as im:
+            arr[y : y + ih, x : x + iw] = np.asarray(im.convert("RGB"))
+        # 2px outline on [x, y, x + iw, y + ih] (inclusive), same as draw.rectangle(width=2)
+        x1, y1 = x + iw, y + ih
+        arr[y : y + 2, x : x1 + 1] = outline
+        arr[y1 - 1 : y1 + 1, x : x1 + 1] = outline
+        arr[y : y1 + 1, x : x + 2] = outline
+        arr[y : y1 + 1, x1 - 1 : x1 + 1] = outline
+        y += ih + pad
+
+    canvas = Image.fromarray(arr, "RGB")
+    # Explicit: no optimize pass (slow on very tall images), default zlib level.
+    canvas.save(out_png, "PNG", optimize=False, compress_level=6)
+    return canvas.size
+
+
 def main() -> int:
     ap = argparse.ArgumentParser()
     ap.add_argument("--past-days", type=int, default=14, help="Look back N days (ignored if --start-date given)")
@@ -69,20 +101,27 @@ def main() -> int:
     )
     ap.add_argument("--max-height", type=int, default=1500)
     ap.add_argument("--merge-width", type=int, default=1200, help="Keep merge at native card width to avoid blur")
+    ap.add_argument("--workers", type=int, default=8, help="Cards fetched/rendered concurrently (default: 8)")
+    ap.add_argument(
+        "--chunk-cards",
+        type=int,
+        default=0,
+        help="If > 0, merge at most N cards per PNG (<out-prefix>_merged_01.png, ...); all go into the ZIP",
+    )
     args = ap.parse_args()
 
-    tz = pytz.timezone(args.tz)
+    tz = ZoneInfo(args.tz)
     now = datetime.now(tz)
 
     if args.start_date:
         y, m, d = (int(x) for x in args.start_date.split("-"))
-        start = tz.localize(datetime(y, m, d, 0, 0, 0))
+        start = datetime(y, m, d, 0, 0, 0, tzinfo=tz)
     else:
         start = (now - timedelta(days=args.past_days)).replace(hour=0, minute=0, second=0, microsecond=0)
 
     if args.end_date:
         y, m, d = (int(x) for x in args.end_date.split("-"))
-        end = tz.localize(datetime(y, m, d, 23, 59, 59))
+        end = datetime(y, m, d, 23, 59, 59, tzinfo=tz)
     else:
         end = (now + timedelta(days=args.future_days)).replace(hour=23, minute=59, second=59, microsecond=0)
 
@@ -101,52 +140,75 @@ def main() -> int:
         entries.append((ts, a.get("title", "").strip(), eu))
     entries.sort(key=lambda x: x[0])
 
+    # Same CD can appear under several brand rows; render each event_url once (earliest wins).
+    seen: set[str] = set()
+    deduped = []
+    for e in entries:
+        if e[2] in seen:
+            continue
+        seen.add(e[2])
+        deduped.append(e)
+    if len(deduped) < len(entries):
+        print("skipped duplicates", len(entries) - len(deduped))
+    entries = deduped
+
     out_dir = os.path.abspath(args.out_dir)
     cards_dir = os.path.join(out_dir, f"{args.out_prefix}_cards")
     os.makedirs(cards_dir, exist_ok=True)
 
-    renderer_path = os.path.join(os.path.dirname(__file__), "render_cd_card.py")
-    renderer = load_renderer(renderer_path)
+    # Fonts/layout constants/session are shared by every card in the batch.
+    ctx = renderer.make_card_context(args.font)
 
-    card_paths: list[str] = []
-    for i, (_, title, url) in enumerate(entries, start=1):
+    def _process_one(i: int, url: str) -> str:
         out = os.path.join(cards_dir, f"{i:02d}_{safe_name(url)}.png")
-        soup = renderer.fetch_release_page(url)
+        soup = renderer.fetch_release_page(url, session=ctx.session)
         info = renderer.parse_release_info(url, soup)
-        renderer.render_card(url, info, args.font, out, w=args.merge_width, h=None, max_height=args.max_height)
-        card_paths.append(out)
+        # Per-card PNGs are intermediates (merged + zipped later): favour encode speed.
+        renderer.render_card(
+            url,
+            info,
+            ctx,
+            out,
+            w=args.merge_width,
+            h=None,
+            max_height=args.max_height,
+            save_kwargs={"compress_level": 1, "optimize": False},
+        )
         print("ok", i, url)
+        return out
+
+    # Per-card work is mostly network-bound; overlap it across threads (sharing the
+    # renderer's pooled session). executor.map keeps card_paths in schedule order.
+    indexes = range(1, len(entries) + 1)
+    urls = [url for _, _, url in entries]
+    with ThreadPoolExecutor(max_workers=max(1, args.workers)) as ex:
+        card_paths: list[str] = list(ex.map(_process_one, indexes, urls))
 
     if not card_paths:
         print("no cards")
         return 0
 
-    # Merge (single column, no scaling)
-    cards = [Image.open(p).convert("RGB") for p in card_paths]
-    w = max(im.size[0] for im in cards)
-    pad = 30
-    bg = (245, 245, 245)
-    W = pad + w + pad
-    H = pad + sum(im.size[1] for im in cards) + pad * (len(cards) - 1) + pad
-
-    canvas = Image.new("RGB", (W, H), bg)
-    draw = ImageDraw.Draw(canvas)
-
-    y = pad
-    for im in cards:
-        x = pad + (w - im.size[0]) // 2
-        canvas.paste(im, (x, y))
-        draw.rectangle([x, y, x + im.size[0], y + im.size[1]], outline=(220, 220, 220), width=2)
-        y += im.size[1] + pad
+    # Merge (single column, no scaling). With --chunk-cards, split into several pages
+    # so very tall canvases stay manageable.
+    if args.chunk_cards > 0:
+        n = args.chunk_cards
+        chunks = [card_paths[k : k + n] for k in range(0, len(card_paths), n)]
+    else:
+        chunks = [card_paths]
 
-    merged_png = os.path.join(out_dir, f"{args.out_prefix}_merged.png")
-    canvas.save(merged_png, "PNG")
+    merged_pngs: list[str] = []
+    for ci, chunk in enumerate(chunks, start=1):
+        suffix = f"_{ci:02d}" if len(chunks) > 1 else ""
+        merged_png = os.path.join(out_dir, f"{args.out_prefix}_merged{suffix}.png")
+        size = merge_cards(chunk, merged_png)
+        merged_pngs.append(merged_png)
+        print("merged", merged_png, "size", size)
 
     merged_zip = os.path.join(out_dir, f"{args.out_prefix}_merged.zip")
     with zipfile.ZipFile(merged_zip, "w", compression=zipfile.ZIP_DEFLATED) as z:
-        z.write(merged_png, arcname=os.path.basename(merged_png))
+        for merged_png in merged_pngs:
+            z.write(merged_png, arcname=os.path.basename(merged_png))
 
-    print("merged", merged_png, "size", canvas.size)
     print("zip", merged_zip)
     return 0
 
@@ -13,10 +13,9 @@ Behavior:
 from __future__ import annotations
 
 import argparse
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from typing import Any, Dict, List, Tuple
-
-import pytz
+from zoneinfo import ZoneInfo
 
 from imas_tools.portal.article import _fetch_schedule
 
@@ -41,7 +40,7 @@ def _brands_str(a: Dict[str, Any]) -> str:
 def _fmt_ts(ts: int, tz) -> str:
     if not ts:
         return ""
-    dt = datetime.fromtimestamp(ts, tz=pytz.utc).astimezone(tz)
+    dt = datetime.fromtimestamp(ts, tz=timezone.utc).astimezone(tz)
     return dt.strftime("%Y-%m-%d %H:%M")
 
 
@@ -51,7 +50,7 @@ def fetch(start: datetime, end: datetime, limit: int = 500) -> List[Dict[str, An
 
 
 def render(items: List[Dict[str, Any]], tz_name: str) -> str:
-    tz = pytz.timezone(tz_name)
+    tz = ZoneInfo(tz_name)
 
     rows: List[Tuple[int, Dict[str, Any]]] = []
     for a in items:
@@ -103,12 +102,12 @@ def main() -> int:
     ap.add_argument("--limit", type=int, default=500)
     args = ap.parse_args()
 
-    tz = pytz.timezone(args.tz)
+    tz = ZoneInfo(args.tz)
     now = datetime.now(tz)
 
     if args.start_date:
         y, m, d = (int(x) for x in args.start_date.split("-"))
-        start = tz.localize(datetime(y, m, d, 0, 0, 0))
+        start = datetime(y, m, d, 0, 0, 0, tzinfo=tz)
     else:
         start = (now - timedelta(days=args.past_days)).replace(
             hour=0, minute=0, second=0, microsecond=0
@@ -116,7 +115,7 @@ def main() -> int:
 
     if args.end_date:
         y, m, d = (int(x) for x in args.end_date.split("-"))
-        end = tz.localize(datetime(y, m, d, 23, 59, 59))
+        end = datetime(y, m, d, 23, 59, 59, tzinfo=tz)
     else:
         end = (now + timedelta(days=args.future_days)).replace(
             hour=23, minute=59, second=59, microsecond=0